@@ -0,0 +1,168 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from configs import Config
+from typing import Deque, Dict, List, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+
+logger = logging.getLogger(__name__)
+
+# "Try Again Later" close code from RFC 6455 / IANA registry
+RETRY_LATER_CLOSE_CODE = 1013
+
+class AdmissionRejected(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Join rejected, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class JoinAdmissionController:
+    """Bounds the number of websocket joins being processed at once.
+
+    Only joins with a valid token are admitted. A join holds a slot for the
+    rest of the handshake (accept, participants list and ``user_joined``
+    broadcast). Joins beyond the global or per-room limit wait in a FIFO
+    queue per room; rooms with a free slot are served in the order their
+    oldest waiter arrived, so a waiter blocked only by its own room's limit
+    does not hold back joins to other rooms, and waking never walks waiters
+    of rooms that are still full. Joins that cannot be queued, or wait
+    longer than ``max_wait``, are rejected with a retry-after hint so a
+    burst is spread out instead of starving existing calls.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_concurrent_per_room: int,
+        max_queued: int,
+        max_wait: float,
+        retry_after: int
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_per_room = max_concurrent_per_room
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.active_per_room: Dict[str, int] = {}
+        self.queued = 0
+        # room_id -> (arrival number, future); cancelled entries are dropped lazily
+        self.room_waiters: Dict[str, Deque[Tuple[int, asyncio.Future]]] = {}
+        # (arrival number of the room's head waiter, room_id) for rooms with a free slot
+        self.ready: List[Tuple[int, str]] = []
+        self._arrivals = itertools.count()
+
+    def _can_admit(self, room_id: str) -> bool:
+        return (
+            self.active < self.max_concurrent
+            and self.active_per_room.get(room_id, 0) < self.max_concurrent_per_room
+        )
+
+    def _grant(self, room_id: str):
+        self.active += 1
+        self.active_per_room[room_id] = self.active_per_room.get(room_id, 0) + 1
+
+    def _mark_ready(self, room_id: str):
+        # Drop cancelled heads, then queue the room if its head could run now
+        waiters = self.room_waiters.get(room_id)
+        while waiters and waiters[0][1].done():
+            waiters.popleft()
+        if not waiters:
+            self.room_waiters.pop(room_id, None)
+            return
+        if self.active_per_room.get(room_id, 0) < self.max_concurrent_per_room:
+            heapq.heappush(self.ready, (waiters[0][0], room_id))
+
+    def _wake(self):
+        # Serve ready rooms by the arrival of their oldest waiter; stale
+        # entries (head already served or room filled up since) are skipped
+        while self.ready and self.active < self.max_concurrent:
+            arrival, room_id = heapq.heappop(self.ready)
+            waiters = self.room_waiters.get(room_id)
+            if not waiters or waiters[0][0] != arrival:
+                continue
+            if self.active_per_room.get(room_id, 0) >= self.max_concurrent_per_room:
+                continue
+            _, future = waiters.popleft()
+            if not future.done():
+                self.queued -= 1
+                self._grant(room_id)
+                future.set_result(None)
+            self._mark_ready(room_id)
+
+    def _drop_waiter(self, room_id: str, future: asyncio.Future):
+        future.cancel()
+        self.queued -= 1
+        waiters = self.room_waiters.get(room_id)
+        if waiters and waiters[0][1] is future:
+            self._mark_ready(room_id)
+
+    def _retry_after_hint(self) -> int:
+        # Scale with the backlog and add jitter so rejected clients don't all come back together
+        backlog = self.queued / max(self.max_concurrent, 1)
+        return math.ceil(self.retry_after * (1 + backlog) * random.uniform(1.0, 1.5))
+
+    async def acquire(self, room_id: str):
+        if not self.queued and self._can_admit(room_id):
+            self._grant(room_id)
+            return
+
+        if self.queued >= self.max_queued:
+            raise AdmissionRejected(self._retry_after_hint())
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self.room_waiters.setdefault(room_id, deque())
+        waiters.append((next(self._arrivals), future))
+        self.queued += 1
+        if len(waiters) == 1:
+            self._mark_ready(room_id)
+        self._wake()
+
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(room_id)
+            else:
+                self._drop_waiter(room_id, future)
+            raise
+
+        if not future.done():
+            self._drop_waiter(room_id, future)
+            logger.warning(f"Join to room {room_id} timed out in admission queue")
+            raise AdmissionRejected(self._retry_after_hint())
+
+    def release(self, room_id: str):
+        self.active -= 1
+        remaining = self.active_per_room.get(room_id, 0) - 1
+        if remaining > 0:
+            self.active_per_room[room_id] = remaining
+        else:
+            self.active_per_room.pop(room_id, None)
+        self._mark_ready(room_id)
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, room_id: str):
+        await self.acquire(room_id)
+        try:
+            yield
+        finally:
+            self.release(room_id)
+
+    def stats(self) -> dict:
+        return {
+            "active_joins": self.active,
+            "queued_joins": self.queued
+        }
+
+admission = JoinAdmissionController(
+    max_concurrent=Config.max_concurrent_joins,
+    max_concurrent_per_room=Config.max_concurrent_joins_per_room,
+    max_queued=Config.max_queued_joins,
+    max_wait=Config.max_join_wait_seconds,
+    retry_after=Config.join_retry_after_seconds
+)
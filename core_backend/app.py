@@ -1,4 +1,6 @@
 from connection_manager import manager
+from admission_control import admission
+from chat_archive import chat_archive
 from fastapi import FastAPI
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
@@ -27,10 +29,12 @@ security = HTTPBearer()
 @app.on_event("startup")
 async def startup_event():
     await manager.connect_redis()
+    await chat_archive.open(manager.redis_client)
     logger.info("Application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await chat_archive.close()
     await manager.disconnect_redis()
     logger.info("Application shutdown complete")
 
@@ -42,7 +46,8 @@ async def health_check():
     return {
         "status": "healthy", 
         "timestamp": datetime.utcnow().isoformat(),
-        "redis_connected": manager.redis_client is not None
+        "redis_connected": manager.redis_client is not None,
+        **admission.stats()
     }
 
 if __name__ == "__main__":
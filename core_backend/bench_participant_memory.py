@@ -0,0 +1,138 @@
+"""Memory/CPU benchmark for the Participant model.
+
+Run from this directory with ``python bench_participant_memory.py [count]``.
+Compares the retained bytes per participant against the previous
+``@dataclass`` layout, both bare and holding the same cached
+``participants_list`` JSON, and the cost of building the
+``participants_list`` payload and the room details view.
+"""
+from dataclasses import dataclass
+from data_models import Participant
+from datetime import datetime
+import json
+import sys
+import time
+import tracemalloc
+
+QUALITIES = ("low", "medium", "high")
+
+
+@dataclass
+class DataclassParticipant:
+    """The layout Participant had before it was slotted, as a baseline."""
+    user_id: str
+    username: str
+    websocket: object
+    joined_at: datetime
+    is_screen_sharing: bool = False
+    video_quality: str = "medium"
+    is_audio_muted: bool = False
+    is_video_muted: bool = False
+    role: str = "participant"
+
+    def to_list_json(self) -> str:
+        # Same cache Participant keeps, stored the way a dataclass would
+        self.list_json = json.dumps({
+            "user_id": self.user_id,
+            "username": self.username,
+            "video_quality": self.video_quality,
+            "is_screen_sharing": self.is_screen_sharing,
+            "is_audio_muted": self.is_audio_muted,
+            "is_video_muted": self.is_video_muted
+        })
+        return self.list_json
+
+
+def build_fields(count: int):
+    now = datetime.now()
+    return [(f"user-{i}", f"User {i}", now, QUALITIES[i % 3]) for i in range(count)]
+
+
+def build(cls, fields):
+    return [
+        cls(user_id=user_id, username=username, websocket=None, joined_at=joined_at, video_quality=quality)
+        for user_id, username, joined_at, quality in fields
+    ]
+
+
+def traced(fn):
+    # Only what fn allocates and keeps alive is counted
+    tracemalloc.start()
+    result = fn()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def measure_memory(count: int):
+    # The id/username strings are built before tracing starts, since both
+    # layouts share them
+    fields = build_fields(count)
+
+    def fill_caches(participants):
+        for p in participants:
+            p.to_list_json()
+
+    dataclass_participants, dataclass_bytes = traced(lambda: build(DataclassParticipant, fields))
+    _, dataclass_cache_bytes = traced(lambda: fill_caches(dataclass_participants))
+    participants, slotted_bytes = traced(lambda: build(Participant, fields))
+    _, slotted_cache_bytes = traced(lambda: fill_caches(participants))
+
+    dataclass_total = (dataclass_bytes + dataclass_cache_bytes) / count
+    slotted_total = (slotted_bytes + slotted_cache_bytes) / count
+
+    print(f"{'participants:':<36}{count}")
+    print(f"{'dataclass bytes/participant:':<36}{dataclass_bytes / count:.1f}")
+    print(f"{'slotted bytes/participant:':<36}{slotted_bytes / count:.1f}")
+    print(f"{'dataclass + cached JSON:':<36}{dataclass_total:.1f}")
+    print(f"{'slotted + cached JSON:':<36}{slotted_total:.1f}")
+    print(
+        f"slotted layout saves {dataclass_total - slotted_total:.0f} bytes/participant "
+        f"({1 - slotted_total / dataclass_total:.0%}) with the same cache; the cached "
+        f"JSON itself costs {slotted_cache_bytes / count:.0f} bytes/participant in exchange "
+        "for not re-encoding every member on each join"
+    )
+
+
+def measure_views(count: int, rounds: int = 20):
+    fields = build_fields(count)
+    participants = build(Participant, fields)
+    baseline = build(DataclassParticipant, fields)
+
+    def dataclass_participants_list():
+        return json.dumps([
+            {
+                "user_id": p.user_id,
+                "username": p.username,
+                "video_quality": p.video_quality,
+                "is_screen_sharing": p.is_screen_sharing,
+                "is_audio_muted": p.is_audio_muted,
+                "is_video_muted": p.is_video_muted
+            }
+            for p in baseline
+        ])
+
+    def participants_list():
+        return ", ".join(p.to_list_json() for p in participants)
+
+    def room_view():
+        return [p.to_room_view() for p in participants]
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    print(f"{'dataclass participants_list:':<36}{timed(dataclass_participants_list):.2f}ms")
+    start = time.perf_counter()
+    participants_list()
+    cold = (time.perf_counter() - start) * 1000
+    print(f"{'participants_list:':<36}cold {cold:.2f}ms, cached {timed(participants_list):.2f}ms")
+    print(f"{'room_view (built on demand):':<36}{timed(room_view):.2f}ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    measure_memory(count)
+    measure_views(count)
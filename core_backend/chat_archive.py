@@ -0,0 +1,314 @@
+from configs import Config
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MAX_SEQ = 2 ** 63 - 1
+
+# Assigns the next per-room seq and pushes the message in one step, so the
+# hot list is always ordered by seq. ARGV[1] is the message JSON without seq.
+# Returns the seq, the new length and how many entries the cap dropped.
+PUSH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local entry = string.sub(ARGV[1], 1, -2) .. ', "seq": ' .. seq .. '}'
+local length = redis.call('LPUSH', KEYS[2], entry)
+local max_length = tonumber(ARGV[2])
+local trimmed = 0
+if length > max_length then
+    redis.call('LTRIM', KEYS[2], 0, max_length - 1)
+    trimmed = length - max_length
+    length = max_length
+end
+return {seq, length, trimmed}
+"""
+
+# Removes archived entries from the tail of the hot list. Only entries with
+# seq <= ARGV[1] (the newest archived seq) are popped, so if the length cap
+# trimmed the list after the segment was read, nothing unarchived is lost.
+TRIM_ARCHIVED_SCRIPT = """
+local removed = 0
+for i = 1, tonumber(ARGV[2]) do
+    local entry = redis.call('LINDEX', KEYS[1], -1)
+    if not entry then
+        break
+    end
+    local seq = cjson.decode(entry)['seq'] or 0
+    if seq > tonumber(ARGV[1]) then
+        break
+    end
+    redis.call('RPOP', KEYS[1])
+    removed = removed + 1
+end
+return removed
+"""
+
+# Renew the owner lease if this node holds it, or take it if it has expired
+CLAIM_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not owner then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Release the owner lease only if this node still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+OWNER_KEY = "chat_archive:owner"
+
+class ChatArchive:
+    """Cold tier for chat history that has aged out of the Redis hot tail.
+
+    ``chat:{room_id}`` in Redis keeps the newest messages. Once it holds a
+    full segment beyond ``chat_hot_messages``, the oldest segment is moved
+    here as one zlib-compressed row, keyed by room and the sequence number
+    of its first message. Rows are only ever inserted, so reading one page
+    touches at most a couple of segments however deep the history goes.
+
+    Only one process moves messages into the archive at a time: the holder
+    of an owner lease in Redis. Other processes keep serving reads from the
+    same file and take the lease over once the holder stops renewing it, so
+    a restarted or reloaded process never fails to start on a stale lease.
+    The file is local to the host, so processes on other hosts sharing the
+    same Redis cannot read segments archived here.
+    """
+
+    def __init__(self, path: str, hot_messages: int, segment_messages: int):
+        self.path = path
+        self.hot_messages = hot_messages
+        self.segment_messages = segment_messages
+        self.db: Optional[sqlite3.Connection] = None
+        self.owner_token = str(uuid.uuid4())
+        self.owns_archive = False
+        self.redis_client = None
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._renew_task: Optional[asyncio.Task] = None
+
+    async def open(self, redis_client=None):
+        await asyncio.to_thread(self._open)
+        logger.info(f"Chat archive opened at {self.path}")
+
+        if redis_client:
+            self.redis_client = redis_client
+            await self._claim_ownership()
+            if not self.owns_archive:
+                logger.info("Chat archive ownership is held by another process, waiting to take over")
+            self._renew_task = asyncio.create_task(self._maintain_ownership())
+
+    async def _claim_ownership(self):
+        claim = self.redis_client.register_script(CLAIM_SCRIPT)
+        try:
+            owns = bool(await claim(
+                keys=[OWNER_KEY], args=[self.owner_token, Config.chat_archive_owner_ttl_seconds]
+            ))
+        except Exception as e:
+            # Keep the current state; an expired lease is reclaimed once Redis is back
+            logger.error(f"Failed to renew chat archive ownership: {e}")
+            return
+        if owns and not self.owns_archive:
+            logger.info("Took chat archive ownership, archiving on this process")
+        elif not owns and self.owns_archive:
+            logger.error("Chat archive ownership is held by another process, archiving stopped here")
+        self.owns_archive = owns
+
+    async def _maintain_ownership(self):
+        while True:
+            await asyncio.sleep(Config.chat_archive_owner_ttl_seconds / 3)
+            await self._claim_ownership()
+
+    def _open(self):
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_segments (
+                room_id TEXT NOT NULL,
+                first_seq INTEGER NOT NULL,
+                last_seq INTEGER NOT NULL,
+                first_ts TEXT,
+                last_ts TEXT,
+                message_count INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (room_id, first_seq)
+            )
+            """
+        )
+        self.db.commit()
+
+    async def close(self):
+        if self._renew_task:
+            self._renew_task.cancel()
+            self._renew_task = None
+        # Let cancelled archive moves unwind before the connection goes away
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.owns_archive:
+            self.owns_archive = False
+            try:
+                release = self.redis_client.register_script(RELEASE_SCRIPT)
+                await release(keys=[OWNER_KEY], args=[self.owner_token])
+            except Exception as e:
+                logger.error(f"Failed to release chat archive ownership: {e}")
+        if self.db:
+            await asyncio.to_thread(self._close_db)
+
+    def _close_db(self):
+        # A cancelled task's to_thread write may still be running
+        with self._lock:
+            self.db.close()
+            self.db = None
+
+    def _append_segment(self, room_id: str, messages: List[dict]):
+        seqs = [m.get("seq", 0) for m in messages]
+        data = zlib.compress(json.dumps(messages).encode())
+        with self._lock:
+            if not self.db:
+                raise RuntimeError("Chat archive is closed")
+            # Primary key makes a retried move after a crash a no-op
+            self.db.execute(
+                "INSERT OR IGNORE INTO chat_segments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    room_id,
+                    min(seqs),
+                    max(seqs),
+                    messages[0].get("timestamp"),
+                    messages[-1].get("timestamp"),
+                    len(messages),
+                    data
+                )
+            )
+            self.db.commit()
+
+    def _read_before(self, room_id: str, before: int, limit: int) -> List[dict]:
+        # A page can span at most this many segments
+        segments = limit // self.segment_messages + 2
+        with self._lock:
+            if not self.db:
+                return []
+            rows = self.db.execute(
+                """
+                SELECT data FROM chat_segments
+                WHERE room_id = ? AND first_seq < ?
+                ORDER BY first_seq DESC LIMIT ?
+                """,
+                (room_id, before, segments)
+            ).fetchall()
+
+        messages = []
+        for (data,) in rows:
+            for message in reversed(json.loads(zlib.decompress(data))):
+                if message.get("seq", 0) < before:
+                    messages.append(message)
+                    if len(messages) == limit:
+                        return messages
+        return messages
+
+    async def read_before(self, room_id: str, before: Optional[int], limit: int) -> List[dict]:
+        """Up to ``limit`` archived messages with ``seq < before``, newest first."""
+        if not self.db:
+            return []
+        return await asyncio.to_thread(
+            self._read_before, room_id, MAX_SEQ if before is None else before, limit
+        )
+
+    async def page(self, redis_client, room_id: str, before: Optional[int], limit: int) -> Tuple[List[dict], Optional[int]]:
+        """One page of history with ``seq < before``, newest first, and the cursor for the next page.
+
+        The hot tail is read first; whatever it can't fill comes from the
+        archive, starting below the oldest message the hot tail returned.
+        """
+        page = []
+
+        if redis_client:
+            try:
+                # The hot tail is bounded, so filtering it for an older page stays cheap
+                end = limit - 1 if before is None else -1
+                for raw in await redis_client.lrange(f"chat:{room_id}", 0, end):
+                    message = json.loads(raw)
+                    if before is None or message.get("seq", 0) < before:
+                        page.append(message)
+                        if len(page) == limit:
+                            break
+            except Exception as e:
+                logger.error(f"Redis error reading chat history: {e}")
+
+        if len(page) < limit:
+            cursor = page[-1].get("seq", 0) if page else before
+            try:
+                page.extend(await self.read_before(room_id, cursor, limit - len(page)))
+            except Exception as e:
+                logger.error(f"Chat archive error: {e}")
+
+        next_before = None
+        if len(page) == limit and "seq" in page[-1]:
+            next_before = page[-1]["seq"]
+        return page, next_before
+
+    async def push(self, redis_client, room_id: str, message: dict) -> int:
+        """Store a chat message in the hot tail and return its sequence number."""
+        push = redis_client.register_script(PUSH_SCRIPT)
+        seq, length, trimmed = await push(
+            keys=[f"chat_seq:{room_id}", f"chat:{room_id}"],
+            args=[json.dumps(message), Config.chat_redis_max_messages]
+        )
+        if trimmed:
+            # Everything archived has already left the list, so these are lost
+            logger.error(
+                f"Chat history cap dropped {trimmed} unarchived messages in room {room_id}; "
+                "archiving is not keeping up or this process does not own the archive"
+            )
+        self.schedule(redis_client, room_id, length)
+        return seq
+
+    def schedule(self, redis_client, room_id: str, hot_length: int):
+        """Start moving old messages out of Redis once a full segment has built up."""
+        if not self.owns_archive or hot_length < self.hot_messages + self.segment_messages:
+            return
+        if room_id in self._tasks:
+            return
+        task = asyncio.create_task(self._archive_room(redis_client, room_id))
+        self._tasks[room_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(room_id, None))
+
+    async def _archive_room(self, redis_client, room_id: str):
+        key = f"chat:{room_id}"
+        trim_archived = redis_client.register_script(TRIM_ARCHIVED_SCRIPT)
+        try:
+            while self.owns_archive and await redis_client.llen(key) >= self.hot_messages + self.segment_messages:
+                # The list is newest first, so the oldest segment is at the tail
+                raw = await redis_client.lrange(key, -self.segment_messages, -1)
+                messages = [json.loads(m) for m in reversed(raw)]
+                await asyncio.to_thread(self._append_segment, room_id, messages)
+                newest_seq = max(m.get("seq", 0) for m in messages)
+                removed = await trim_archived(keys=[key], args=[newest_seq, len(messages)])
+                logger.info(f"Archived {len(messages)} chat messages for room {room_id}")
+                if not removed:
+                    break
+        except Exception as e:
+            logger.error(f"Error archiving chat for room {room_id}: {e}")
+
+chat_archive = ChatArchive(
+    Config.chat_archive_path,
+    hot_messages=Config.chat_hot_messages,
+    segment_messages=Config.chat_segment_messages
+)
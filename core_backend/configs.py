@@ -1,5 +1,5 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 class Config:
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -10,6 +10,38 @@ class Config:
     # File upload settings
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     upload_directory: str = "uploads"
+
+    # Join admission control
+    max_concurrent_joins: int = int(os.getenv("MAX_CONCURRENT_JOINS", "64"))
+    max_concurrent_joins_per_room: int = 8
+    max_queued_joins: int = 2000
+    max_join_wait_seconds: float = 10.0
+    join_retry_after_seconds: int = 5
+
+    # Chat history: newest messages stay in Redis, older ones go to the archive
+    chat_archive_path: str = os.getenv("CHAT_ARCHIVE_PATH", "chat_archive.db")
+    chat_hot_messages: int = 100
+    chat_segment_messages: int = 100
+    chat_redis_max_messages: int = 1000  # Hard cap if archiving falls behind
+    chat_page_max: int = 100
+    chat_archive_owner_ttl_seconds: int = 30
+
+    # Media stats and video quality recommendations
+    media_stats_window: int = 6  # Samples kept per participant
+    media_recommendation_interval: float = 2.0  # Seconds between evaluations per room
+    media_stats_max_age: float = 6.0  # Seconds before a silent client's stats are ignored
+    media_stats_loss_threshold: float = 0.05
+    media_stats_rtt_threshold_ms: float = 400.0
+    media_upgrade_stable_evaluations: int = 3  # Clean evaluations before stepping a tier up
+    video_quality_bitrates: Dict[str, int] = {  # Highest first, kbps per stream
+        "high": 1500,
+        "medium": 600,
+        "low": 200
+    }
+    max_video_quality_by_room_size: List[Tuple[int, str]] = [
+        (4, "high"),
+        (8, "medium")
+    ]
     
     stun_servers = [
         "stun:stun.l.google.com:19302",
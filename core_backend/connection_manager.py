@@ -1,4 +1,5 @@
-from data_models import Participant
+from data_models import Participant, participants_list_json
+from media_stats import media_stats
 from models import * 
 import redis.asyncio as redis
 from typing import Dict, Optional
@@ -51,6 +52,7 @@ class ConnectionManager:
             username = participant.username
             del self.rooms[room_id][user_id]
             del self.user_rooms[user_id]
+            media_stats.remove(room_id, user_id)
 
             if not self.rooms[room_id]:
                 del self.rooms[room_id]
@@ -119,38 +121,15 @@ class ConnectionManager:
             "timestamp": datetime.now().isoformat()
         }, exclude_user=user_id)
 
-        participants = [
-            {
-                "user_id": p.user_id,
-                "username": p.username,
-                "video_quality": p.video_quality,
-                "is_screen_sharing": p.is_screen_sharing,
-                "is_audio_muted": p.is_audio_muted,
-                "is_video_muted": p.is_video_muted
-            }
-            for p in self.rooms[room_id].values()
-        ]
-
-        await websocket.send_text(json.dumps({
-            "type": "participants_list",
-            "participants": participants
-        }))
+        # Splice the cached per-participant JSON instead of re-encoding everyone
+        await websocket.send_text(participants_list_json(self.rooms[room_id].values()))
         
         logger.info(f"Participant {username} ({user_id}) added to room {room_id}")
         return True
 
     def get_room_participants(self, room_id: str):
         if room_id in self.rooms:
-            return [
-                {
-                    "user_id": p.user_id,
-                    "username": p.username,
-                    "joined_at": p.joined_at.isoformat(),
-                    "is_screen_sharing": p.is_screen_sharing,
-                    "video_quality": p.video_quality
-                }
-                for p in self.rooms[room_id].values()
-            ]
+            return [p.to_room_view() for p in self.rooms[room_id].values()]
         return []
 
 manager = ConnectionManager()
\ No newline at end of file
@@ -1,16 +1,158 @@
-from dataclasses import dataclass
-from fastapi import WebSocket
 from datetime import datetime
-from typing import Optional
+from configs import Config
+from typing import TYPE_CHECKING, Iterable
+import json
+import sys
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+
+# Bit positions for the packed boolean state in Participant._flags
+SCREEN_SHARING = 1 << 0
+AUDIO_MUTED = 1 << 1
+VIDEO_MUTED = 1 << 2
+
+
+def _flag_property(bit: int, doc: str):
+    def getter(self) -> bool:
+        return bool(self._flags & bit)
+
+    def setter(self, value: bool):
+        flags = (self._flags | bit) if value else (self._flags & ~bit)
+        if flags != self._flags:
+            self._flags = flags
+            self._invalidate()
+
+    return property(getter, setter, doc=doc)
+
+
+def _field_property(name: str, doc: str, intern: bool = False, choices=None):
+    slot = f"_{name}"
+
+    def getter(self):
+        return getattr(self, slot)
+
+    def setter(self, value):
+        if choices is not None and value not in choices:
+            raise ValueError(f"Invalid {name}: {value!r}")
+        if intern:
+            value = sys.intern(value)
+        if value != getattr(self, slot, None):
+            setattr(self, slot, value)
+            self._invalidate()
+
+    return property(getter, setter, doc=doc)
+
 
-@dataclass
 class Participant:
-    user_id: str
-    username: str
-    websocket: WebSocket
-    joined_at: datetime
-    is_screen_sharing: bool = False
-    video_quality: str = "medium"
-    is_audio_muted: bool = False
-    is_video_muted: bool = False
-    role: str = "participant"
\ No newline at end of file
+    """A connected room member.
+
+    Kept compact because a node can host tens of thousands of these: fields
+    live in ``__slots__``, the mute/screen-share booleans are packed into a
+    single int and the low-cardinality ``video_quality``/``role`` strings are
+    interned. The ``participants_list`` entry, which every join re-sends for
+    every member, is encoded once and cached as a string until one of the
+    fields it depends on changes.
+    """
+
+    __slots__ = (
+        "websocket",
+        "_user_id",
+        "_username",
+        "_joined_at",
+        "_flags",
+        "_video_quality",
+        "_role",
+        "_list_json",
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        username: str,
+        websocket: "WebSocket",
+        joined_at: datetime,
+        is_screen_sharing: bool = False,
+        video_quality: str = "medium",
+        is_audio_muted: bool = False,
+        is_video_muted: bool = False,
+        role: str = "participant",
+    ):
+        self.websocket = websocket
+        self._user_id = user_id
+        self._username = username
+        self._joined_at = joined_at
+        self._flags = (
+            (SCREEN_SHARING if is_screen_sharing else 0)
+            | (AUDIO_MUTED if is_audio_muted else 0)
+            | (VIDEO_MUTED if is_video_muted else 0)
+        )
+        self._video_quality = None
+        self._role = None
+        self.video_quality = video_quality
+        self.role = role
+
+    is_screen_sharing = _flag_property(SCREEN_SHARING, "Whether the participant is sharing their screen.")
+    is_audio_muted = _flag_property(AUDIO_MUTED, "Whether the participant's microphone is muted.")
+    is_video_muted = _flag_property(VIDEO_MUTED, "Whether the participant's camera is muted.")
+    user_id = _field_property("user_id", "Stable id of the user (JWT ``sub``).")
+    username = _field_property("username", "Display name of the user.")
+    joined_at = _field_property("joined_at", "When the participant joined the room.")
+    video_quality = _field_property(
+        "video_quality",
+        "Requested video quality, one of ``Config.video_quality_bitrates``.",
+        intern=True,
+        choices=Config.video_quality_bitrates
+    )
+    role = _field_property("role", "Participant role within the room.", intern=True)
+
+    def _invalidate(self):
+        self._list_json = None
+
+    def to_list_view(self) -> dict:
+        """Entry sent to clients in the ``participants_list`` message."""
+        return {
+            "user_id": self._user_id,
+            "username": self._username,
+            "video_quality": self._video_quality,
+            "is_screen_sharing": self.is_screen_sharing,
+            "is_audio_muted": self.is_audio_muted,
+            "is_video_muted": self.is_video_muted
+        }
+
+    def to_list_json(self) -> str:
+        """Cached JSON encoding of :meth:`to_list_view`, for splicing into messages."""
+        if self._list_json is None:
+            self._list_json = json.dumps(self.to_list_view())
+        return self._list_json
+
+    def to_room_view(self) -> dict:
+        """Entry returned by the room details REST endpoint.
+
+        Built on demand: the endpoint is rarely called, so caching it would
+        cost more memory than it saves.
+        """
+        return {
+            "user_id": self._user_id,
+            "username": self._username,
+            "joined_at": self._joined_at.isoformat(),
+            "is_screen_sharing": self.is_screen_sharing,
+            "video_quality": self._video_quality
+        }
+
+    def __repr__(self):
+        return (
+            f"Participant(user_id={self._user_id!r}, username={self._username!r}, "
+            f"video_quality={self._video_quality!r}, role={self._role!r}, "
+            f"is_screen_sharing={self.is_screen_sharing}, "
+            f"is_audio_muted={self.is_audio_muted}, is_video_muted={self.is_video_muted})"
+        )
+
+
+def participants_list_json(participants: Iterable[Participant]) -> str:
+    """The ``participants_list`` message, spliced from each member's cached JSON.
+
+    Produces the same text as ``json.dumps`` of the full message.
+    """
+    participants_json = ", ".join(p.to_list_json() for p in participants)
+    return f'{{"type": "participants_list", "participants": [{participants_json}]}}'
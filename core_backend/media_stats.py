@@ -0,0 +1,201 @@
+from array import array
+from configs import Config
+from typing import Dict, Iterable, List
+import math
+import time
+
+# Field offsets within one sample of a RollingWindow
+RTT, LOSS, AVAILABLE_IN_KBPS, AVAILABLE_OUT_KBPS = range(4)
+FIELDS = 4
+
+class RollingWindow:
+    """Last ``size`` media stats samples of one participant.
+
+    Samples are kept in a single flat float array used as a ring buffer,
+    which is much smaller than a deque of dicts when a room has many members.
+    A bandwidth estimate of 0 means the client did not report it.
+    """
+
+    __slots__ = ("size", "samples", "next", "count", "updated_at")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.samples = array("f", bytes(4 * FIELDS * size))
+        self.next = 0
+        self.count = 0
+        self.updated_at = 0.0
+
+    def add(self, rtt_ms: float, packet_loss: float, available_in_kbps: float, available_out_kbps: float):
+        base = self.next * FIELDS
+        self.samples[base + RTT] = rtt_ms
+        self.samples[base + LOSS] = packet_loss
+        self.samples[base + AVAILABLE_IN_KBPS] = available_in_kbps
+        self.samples[base + AVAILABLE_OUT_KBPS] = available_out_kbps
+        self.next = (self.next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.updated_at = time.monotonic()
+
+    def mean(self, field: int) -> float:
+        values = [self.samples[i * FIELDS + field] for i in range(self.count)]
+        if field in (AVAILABLE_IN_KBPS, AVAILABLE_OUT_KBPS):
+            values = [v for v in values if v > 0]
+        return sum(values) / len(values) if values else 0.0
+
+    def congested(self) -> bool:
+        return (
+            self.mean(LOSS) > Config.media_stats_loss_threshold
+            or self.mean(RTT) > Config.media_stats_rtt_threshold_ms
+        )
+
+class MediaStatsTracker:
+    """Turns client ``media_stats`` reports into per-sender quality recommendations.
+
+    In a mesh call each sender uploads one stream per peer and each receiver
+    downloads one stream per peer. A sender's target tier is the highest one
+    allowed by the room size that fits its own estimated uplink and the
+    weakest other receiver's estimated downlink, both split across peers.
+    The estimates are the WebRTC available bitrates, not the measured send
+    rate, so a room sending below capacity can still be moved up.
+
+    Loss and RTT are the congestion signal: while any other receiver is
+    congested a sender is stepped down one tier per evaluation. Once the
+    room is healthy it is probed back up one tier after every
+    ``media_upgrade_stable_evaluations`` clean evaluations, up to the target.
+    Windows not updated within ``media_stats_max_age`` are ignored, so a
+    client that stopped reporting can't pin everyone else down.
+    """
+
+    def __init__(self):
+        self.rooms: Dict[str, Dict[str, RollingWindow]] = {}
+        # room_id -> sender -> [tier index, consecutive healthy evaluations]
+        self.recommended: Dict[str, Dict[str, List[int]]] = {}
+        self.last_evaluated: Dict[str, float] = {}
+
+    def record(
+        self,
+        room_id: str,
+        user_id: str,
+        rtt_ms: float,
+        packet_loss: float,
+        available_in_kbps: float = 0.0,
+        available_out_kbps: float = 0.0
+    ):
+        if not all(map(math.isfinite, (rtt_ms, packet_loss, available_in_kbps, available_out_kbps))):
+            return
+        room = self.rooms.setdefault(room_id, {})
+        window = room.get(user_id)
+        if window is None:
+            window = room[user_id] = RollingWindow(Config.media_stats_window)
+        window.add(
+            max(rtt_ms, 0.0),
+            min(max(packet_loss, 0.0), 1.0),
+            max(available_in_kbps, 0.0),
+            max(available_out_kbps, 0.0)
+        )
+
+    def remove(self, room_id: str, user_id: str):
+        self.rooms.get(room_id, {}).pop(user_id, None)
+        self.recommended.get(room_id, {}).pop(user_id, None)
+        if not self.rooms.get(room_id):
+            self.rooms.pop(room_id, None)
+            self.recommended.pop(room_id, None)
+            self.last_evaluated.pop(room_id, None)
+
+    def _room_cap(self, participant_count: int) -> str:
+        for max_size, quality in Config.max_video_quality_by_room_size:
+            if participant_count <= max_size:
+                return quality
+        return "low"
+
+    def recommend(self, room_id: str, participants: Iterable[str]) -> Dict[str, dict]:
+        """Recommendations for senders whose tier changed since last time.
+
+        Evaluation is throttled per room to ``media_recommendation_interval``.
+        """
+        now = time.monotonic()
+        if now - self.last_evaluated.get(room_id, 0.0) < Config.media_recommendation_interval:
+            return {}
+        self.last_evaluated[room_id] = now
+
+        participants = list(participants)
+        if len(participants) < 2:
+            return {}
+        streams = len(participants) - 1
+        windows = {
+            user_id: window
+            for user_id, window in self.rooms.get(room_id, {}).items()
+            if now - window.updated_at <= Config.media_stats_max_age
+        }
+
+        # Tier indexes grow towards lower quality
+        tiers = list(Config.video_quality_bitrates.items())
+        lowest = len(tiers) - 1
+        cap_index = [quality for quality, _ in tiers].index(self._room_cap(len(participants)))
+
+        # Two weakest receive budgets, so a sender isn't limited by its own downlink
+        budgets = []
+        congested = set()
+        for user_id in participants:
+            window = windows.get(user_id)
+            if not window:
+                continue
+            available_in = window.mean(AVAILABLE_IN_KBPS)
+            if available_in:
+                budgets.append((available_in / streams, user_id))
+            if window.congested():
+                congested.add(user_id)
+        budgets = sorted(budgets)[:2]
+
+        room_recommended = self.recommended.setdefault(room_id, {})
+        changed = {}
+
+        for sender in participants:
+            limit, limited_by = None, "room_size"
+            receive = [budget for budget, user_id in budgets if user_id != sender]
+            if receive:
+                limit, limited_by = receive[0], "receiver_bandwidth"
+            window = windows.get(sender)
+            available_out = window.mean(AVAILABLE_OUT_KBPS) if window else 0.0
+            if available_out and (limit is None or available_out / streams < limit):
+                limit, limited_by = available_out / streams, "sender_uplink"
+
+            # Highest tier allowed by the room size that fits the budget, else the lowest
+            target = lowest
+            for index in range(cap_index, len(tiers)):
+                if limit is None or tiers[index][1] <= limit:
+                    target = index
+                    break
+            if limit is None or target == cap_index:
+                limited_by = "room_size"
+
+            state = room_recommended.get(sender)
+            if congested - {sender}:
+                # Back off from wherever the sender is now, even if the estimates look fine
+                current = target if state is None else max(state[0], target)
+                tier, stable, limited_by = min(current + 1, lowest), 0, "congestion"
+            elif state is None or target >= state[0]:
+                # First evaluation, or the budget dropped: go straight to the target
+                tier, stable = target, 0
+            else:
+                stable = state[1] + 1
+                if stable >= Config.media_upgrade_stable_evaluations:
+                    tier, stable = state[0] - 1, 0
+                else:
+                    tier = state[0]
+                if tier > target:
+                    limited_by = "probing"
+
+            previous = state[0] if state else None
+            room_recommended[sender] = [tier, stable]
+            if tier == previous:
+                continue
+            changed[sender] = {
+                "quality": tiers[tier][0],
+                "max_bitrate_kbps": tiers[tier][1],
+                "limited_by": limited_by,
+                "participant_count": len(participants)
+            }
+
+        return changed
+
+media_stats = MediaStatsTracker()
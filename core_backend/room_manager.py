@@ -6,13 +6,15 @@ import uuid
 from models import Room
 from datetime import datetime
 from connection_manager import manager
+from admission_control import admission, AdmissionRejected, RETRY_LATER_CLOSE_CODE
 from configs import Config
 from jose import jwt, JWTError
 from websocket_handler import handle_websocket_message
+from chat_archive import chat_archive
 from pydantic import BaseModel
 import os
 import aiofiles
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/rooms",
@@ -83,28 +85,23 @@ async def get_ice_servers():
 async def get_chat_history(
     room_id: str,
     limit: int = 50,
+    before: Optional[int] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    if manager.redis_client:
+    limit = max(1, min(limit, Config.chat_page_max))
+    page, next_before = await chat_archive.page(manager.redis_client, room_id, before, limit)
+
+    decrypted_messages = []
+    for message_data in page:
         try:
-            messages = await manager.redis_client.lrange(f"chat:{room_id}", 0, limit - 1)
-            decrypted_messages = []
-
-            for msg in messages:
-                try:
-                    message_data = json.loads(msg)
-                    if "content" in message_data:
-                        message_data["content"] = manager.decrypt_message(message_data["content"])
-                    decrypted_messages.append(message_data)
-                except Exception as e:
-                    print(f"Error decrypting message: {e}")
-                    continue
-            
-            return {"messages": list(reversed(decrypted_messages))}
+            if "content" in message_data:
+                message_data["content"] = manager.decrypt_message(message_data["content"])
+            decrypted_messages.append(message_data)
         except Exception as e:
-            print(f"Redis error: {e}")
-    
-    return {"messages": []}
+            print(f"Error decrypting message: {e}")
+            continue
+
+    return {"messages": list(reversed(decrypted_messages)), "next_before": next_before}
 
 @router.get("/{room_id}/whiteboard")
 async def get_whiteboard_state(
@@ -160,8 +157,8 @@ async def upload_file(
 
 @router.websocket("/ws/{room_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, token: str):
+    # Validate token before admission so forged tokens can't take join slots
     try:
-        # Validate token
         payload = jwt.decode(token, Config.secret_key, algorithms=[Config.algorithm])
         user_id = payload.get("sub")
         username = payload.get("username")
@@ -174,9 +171,18 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, token: str):
         await websocket.close(code=1008, reason="Invalid token")
         return
 
-    await websocket.accept()
-    success = await manager.add_participant(room_id, user_id, username, websocket)
-    if not success:
+    # Hold an admission slot for the rest of the join so a burst of connects
+    # can't starve established sessions
+    try:
+        async with admission.admit(room_id):
+            await websocket.accept()
+            success = await manager.add_participant(room_id, user_id, username, websocket)
+            if not success:
+                return
+    except AdmissionRejected as e:
+        # Accept first so the client actually receives the close code and hint
+        await websocket.accept()
+        await websocket.close(code=RETRY_LATER_CLOSE_CODE, reason=f"retry-after={e.retry_after}")
         return
 
     try:
@@ -0,0 +1,175 @@
+from admission_control import AdmissionRejected, JoinAdmissionController
+import asyncio
+import pytest
+
+
+def make_controller(**overrides):
+    options = dict(max_concurrent=2, max_concurrent_per_room=1, max_queued=10, max_wait=1.0, retry_after=5)
+    options.update(overrides)
+    return JoinAdmissionController(**options)
+
+
+def test_admits_immediately_under_limits():
+    async def scenario():
+        controller = make_controller()
+        await controller.acquire("a")
+        await controller.acquire("b")
+        assert controller.stats() == {"active_joins": 2, "queued_joins": 0}
+        controller.release("a")
+        controller.release("b")
+        assert controller.active == 0
+        assert controller.active_per_room == {}
+
+    asyncio.run(scenario())
+
+
+def test_rejects_when_queue_is_full():
+    async def scenario():
+        controller = make_controller(max_concurrent=1, max_queued=1)
+        await controller.acquire("a")
+        queued = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued_joins"] == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c")
+        # Base retry-after scaled by the backlog (1 queued / 1 slot) and jitter
+        assert 10 <= rejected.value.retry_after <= 15
+
+        controller.release("a")
+        await queued
+        assert controller.active_per_room == {"b": 1}
+
+    asyncio.run(scenario())
+
+
+def test_rejects_after_max_wait():
+    async def scenario():
+        controller = make_controller(max_concurrent=1, max_wait=0.05)
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b")
+        assert controller.stats() == {"active_joins": 1, "queued_joins": 0}
+
+        # The timed out waiter must not be granted the slot later
+        controller.release("a")
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = make_controller(max_concurrent=1)
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.stats() == {"active_joins": 1, "queued_joins": 0}
+
+        controller.release("a")
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_after_grant_releases_the_slot():
+    async def scenario():
+        controller = make_controller(max_concurrent=1)
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        # Grant and cancel before the waiter gets to run
+        controller.release("a")
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.active == 0
+        assert controller.active_per_room == {}
+
+    asyncio.run(scenario())
+
+
+def test_full_room_does_not_block_other_rooms():
+    async def scenario():
+        controller = make_controller(max_concurrent=3, max_concurrent_per_room=1)
+        await controller.acquire("a")
+        blocked = asyncio.create_task(controller.acquire("a"))
+        await asyncio.sleep(0)
+
+        # Arrives after the queued room "a" waiter but is admitted first
+        await asyncio.wait_for(controller.acquire("b"), timeout=0.5)
+        assert not blocked.done()
+        assert controller.active_per_room == {"a": 1, "b": 1}
+
+        controller.release("a")
+        await blocked
+        assert controller.active_per_room == {"a": 1, "b": 1}
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_served_in_arrival_order():
+    async def scenario():
+        controller = make_controller(max_concurrent=1, max_concurrent_per_room=5)
+        order = []
+
+        async def join(room_id):
+            async with controller.admit(room_id):
+                order.append(room_id)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(join(room_id) for room_id in ("a", "b", "c", "d")))
+        assert order == ["a", "b", "c", "d"]
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_burst_into_one_room_does_not_scan_its_queue():
+    async def scenario():
+        controller = make_controller(max_concurrent=64, max_concurrent_per_room=8, max_queued=2000, max_wait=5.0)
+        for _ in range(8):
+            await controller.acquire("big")
+        waiters = [asyncio.create_task(controller.acquire("big")) for _ in range(1500)]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued_joins"] == 1500
+        # The full room is never on the ready heap, so other rooms get straight in
+        assert controller.ready == []
+        await asyncio.wait_for(controller.acquire("other"), timeout=0.5)
+        controller.release("other")
+
+        # Releases hand slots to the big room's waiters in arrival order
+        for _ in range(8):
+            controller.release("big")
+        assert controller.stats() == {"active_joins": 8, "queued_joins": 1492}
+        assert len(controller.ready) <= 1
+        await asyncio.wait_for(asyncio.gather(*waiters[:8]), timeout=0.5)
+        assert not any(w.done() for w in waiters[8:])
+
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiters_are_cleaned_from_room_queue():
+    async def scenario():
+        controller = make_controller(max_concurrent=1)
+        await controller.acquire("a")
+        waiters = [asyncio.create_task(controller.acquire("b")) for _ in range(3)]
+        await asyncio.sleep(0)
+        for w in waiters[:2]:
+            w.cancel()
+        await asyncio.gather(*waiters[:2], return_exceptions=True)
+        assert controller.stats()["queued_joins"] == 1
+
+        controller.release("a")
+        await waiters[2]
+        assert controller.active_per_room == {"b": 1}
+        assert controller.room_waiters == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,306 @@
+from chat_archive import (
+    ChatArchive, CLAIM_SCRIPT, PUSH_SCRIPT, RELEASE_SCRIPT, TRIM_ARCHIVED_SCRIPT
+)
+from configs import Config
+import asyncio
+import json
+import pytest
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis calls the archive makes.
+
+    Scripts are emulated in Python with the same semantics as the Lua in
+    chat_archive; ``test_lua_*`` below run the real Lua when lupa is
+    installed.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.lists = {}
+
+    def register_script(self, source):
+        return {
+            PUSH_SCRIPT: self._push,
+            TRIM_ARCHIVED_SCRIPT: self._trim_archived,
+            CLAIM_SCRIPT: self._claim,
+            RELEASE_SCRIPT: self._release,
+        }[source]
+
+    async def _push(self, keys, args):
+        seq_key, list_key = keys
+        seq = self.strings[seq_key] = self.strings.get(seq_key, 0) + 1
+        entries = self.lists.setdefault(list_key, [])
+        entries.insert(0, args[0][:-1] + f', "seq": {seq}}}')
+        trimmed = max(len(entries) - args[1], 0)
+        del entries[args[1]:]
+        return [seq, len(entries), trimmed]
+
+    async def _trim_archived(self, keys, args):
+        entries = self.lists.get(keys[0], [])
+        removed = 0
+        while removed < args[1] and entries and json.loads(entries[-1]).get("seq", 0) <= args[0]:
+            entries.pop()
+            removed += 1
+        return removed
+
+    async def _claim(self, keys, args):
+        owner = self.strings.get(keys[0])
+        if owner in (None, args[0]):
+            self.strings[keys[0]] = args[0]
+            return 1
+        return 0
+
+    async def _release(self, keys, args):
+        if self.strings.get(keys[0]) == args[0]:
+            del self.strings[keys[0]]
+            return 1
+        return 0
+
+    async def lrange(self, key, start, end):
+        entries = self.lists.get(key, [])
+        end = len(entries) + end if end < 0 else end
+        start = max(len(entries) + start, 0) if start < 0 else start
+        return entries[start:end + 1]
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+
+def make_archive(hot=4, segment=3):
+    return ChatArchive(":memory:", hot_messages=hot, segment_messages=segment)
+
+
+def seqs(messages):
+    return [m["seq"] for m in messages]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_append_and_read_before_spans_segments():
+    archive = make_archive(segment=3)
+    archive._open()
+    for first in (1, 4, 7):
+        archive._append_segment("room", [{"seq": s, "timestamp": str(s)} for s in range(first, first + 3)])
+
+    assert seqs(archive._read_before("room", 2 ** 63 - 1, 4)) == [9, 8, 7, 6]
+    # A cursor inside a segment skips its newer half
+    assert seqs(archive._read_before("room", 6, 4)) == [5, 4, 3, 2]
+    assert seqs(archive._read_before("room", 2, 10)) == [1]
+    assert archive._read_before("other", 2 ** 63 - 1, 10) == []
+
+
+def test_retried_segment_insert_is_ignored():
+    archive = make_archive(segment=3)
+    archive._open()
+    archive._append_segment("room", [{"seq": s} for s in (1, 2, 3)])
+    archive._append_segment("room", [{"seq": s, "retried": True} for s in (1, 2, 3)])
+    rows = archive.db.execute("SELECT COUNT(*) FROM chat_segments").fetchone()[0]
+    assert rows == 1
+    assert not any(m.get("retried") for m in archive._read_before("room", 10, 10))
+
+
+def test_push_injects_increasing_seq():
+    async def scenario():
+        redis_client = FakeRedis()
+        archive = make_archive()
+        await asyncio.gather(*(
+            archive.push(redis_client, "room", {"id": str(i), "content": "x"}) for i in range(5)
+        ))
+        stored = [json.loads(raw) for raw in redis_client.lists["chat:room"]]
+        # Newest first and ordered by seq, with seq written into the stored JSON
+        assert seqs(stored) == [5, 4, 3, 2, 1]
+        assert stored[0]["content"] == "x"
+
+    run(scenario())
+
+
+def test_push_logs_when_cap_drops_unarchived(monkeypatch, caplog):
+    monkeypatch.setattr(Config, "chat_redis_max_messages", 3)
+
+    async def scenario():
+        redis_client = FakeRedis()
+        archive = make_archive()
+        for i in range(4):
+            await archive.push(redis_client, "room", {"id": str(i)})
+        assert len(redis_client.lists["chat:room"]) == 3
+
+    run(scenario())
+    assert "dropped 1 unarchived messages" in caplog.text
+
+
+def test_archiving_moves_oldest_segment_and_pages_across_tiers():
+    async def scenario():
+        redis_client = FakeRedis()
+        archive = make_archive(hot=4, segment=3)
+        archive._open()
+        archive.owns_archive = True
+        for i in range(10):
+            await archive.push(redis_client, "room", {"id": str(i)})
+            # Let each scheduled move finish so the test is deterministic
+            await asyncio.gather(*archive._tasks.values())
+
+        # Each time the list reaches hot + segment = 7 the oldest 3 move out
+        assert seqs(json.loads(m) for m in redis_client.lists["chat:room"]) == [10, 9, 8, 7]
+        assert seqs(archive._read_before("room", 2 ** 63 - 1, 10)) == [6, 5, 4, 3, 2, 1]
+
+        # Latest page comes from the hot tail only
+        page, cursor = await archive.page(redis_client, "room", None, 3)
+        assert seqs(page) == [10, 9, 8]
+        assert cursor == 8
+
+        # Next page starts in the hot tail and continues into the archive
+        page, cursor = await archive.page(redis_client, "room", cursor, 3)
+        assert seqs(page) == [7, 6, 5]
+        assert cursor == 5
+
+        page, cursor = await archive.page(redis_client, "room", cursor, 3)
+        assert seqs(page) == [4, 3, 2]
+        assert cursor == 2
+
+        page, cursor = await archive.page(redis_client, "room", cursor, 3)
+        assert seqs(page) == [1]
+        assert cursor is None
+
+        # A cursor that falls inside the hot tail
+        page, cursor = await archive.page(redis_client, "room", 9, 2)
+        assert seqs(page) == [8, 7]
+        assert cursor == 7
+
+    run(scenario())
+
+
+def test_paging_visits_every_message_once():
+    async def scenario():
+        redis_client = FakeRedis()
+        archive = make_archive(hot=5, segment=4)
+        archive._open()
+        archive.owns_archive = True
+        for i in range(30):
+            await archive.push(redis_client, "room", {"id": str(i)})
+            await asyncio.gather(*archive._tasks.values())
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await archive.page(redis_client, "room", cursor, 3)
+            seen.extend(seqs(page))
+            if cursor is None:
+                break
+        assert seen == list(range(30, 0, -1))
+
+    run(scenario())
+
+
+def test_trim_keeps_entries_newer_than_archived_segment():
+    async def scenario():
+        redis_client = FakeRedis()
+        redis_client.lists["chat:room"] = [json.dumps({"seq": s}) for s in (9, 8, 7, 6)]
+        # The cap already trimmed seq 1-5 after they were read; 6+ were never archived
+        trim = redis_client.register_script(TRIM_ARCHIVED_SCRIPT)
+        assert await trim(keys=["chat:room"], args=[3, 3]) == 0
+        assert len(redis_client.lists["chat:room"]) == 4
+
+    run(scenario())
+
+
+def test_non_owner_does_not_archive_and_takes_over_expired_lease():
+    async def scenario():
+        redis_client = FakeRedis()
+        first = make_archive()
+        second = make_archive()
+        await first.open(redis_client)
+        await second.open(redis_client)
+        assert first.owns_archive and not second.owns_archive
+
+        second.schedule(redis_client, "room", 100)
+        assert second._tasks == {}
+
+        # The owner's lease expires (e.g. it crashed): the next claim takes it
+        del redis_client.strings["chat_archive:owner"]
+        await second._claim_ownership()
+        assert second.owns_archive
+        await first._claim_ownership()
+        assert not first.owns_archive
+
+        await first.close()
+        assert redis_client.strings["chat_archive:owner"] == second.owner_token
+        await second.close()
+        assert "chat_archive:owner" not in redis_client.strings
+
+    run(scenario())
+
+
+class LuaRedis:
+    """Runs the real Lua scripts against in-memory data via lupa."""
+
+    def __init__(self, lupa):
+        self.data = {}
+        self.lua = lupa.LuaRuntime(unpack_returned_tuples=True)
+        self.lua.execute("redis = {}; cjson = {}")
+        self.lua.globals().redis.call = self._call
+        self.lua.globals().cjson.decode = lambda s: self.lua.table_from(json.loads(s))
+
+    def _call(self, command, *args):
+        command = command.upper()
+        if command == "INCR":
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + 1
+            return self.data[args[0]]
+        if command == "LPUSH":
+            self.data.setdefault(args[0], []).insert(0, args[1])
+            return len(self.data[args[0]])
+        if command == "LTRIM":
+            end = int(args[2])
+            self.data[args[0]] = self.data[args[0]][int(args[1]):end + 1]
+            return "OK"
+        if command == "LINDEX":
+            entries = self.data.get(args[0], [])
+            return entries[int(args[1])] if entries else False
+        if command == "RPOP":
+            return self.data[args[0]].pop()
+        if command == "GET":
+            return self.data.get(args[0], False)
+        if command == "SET":
+            self.data[args[0]] = args[1]
+            return "OK"
+        if command == "EXPIRE":
+            return 1
+        if command == "DEL":
+            return 1 if self.data.pop(args[0], None) is not None else 0
+        raise AssertionError(f"unexpected command {command}")
+
+    def run(self, source, keys, args):
+        script = self.lua.eval(f"function(KEYS, ARGV) {source} end")
+        result = script(self.lua.table_from(keys), self.lua.table_from([str(a) for a in args]))
+        return list(result.values()) if hasattr(result, "values") else result
+
+
+@pytest.fixture
+def lua_redis():
+    return LuaRedis(pytest.importorskip("lupa"))
+
+
+def test_lua_push_injects_seq_and_caps(lua_redis):
+    results = [
+        lua_redis.run(PUSH_SCRIPT, ["chat_seq:r", "chat:r"], [json.dumps({"id": i, "content": "x"}), 3])
+        for i in range(4)
+    ]
+    assert results[-1] == [4, 3, 1]
+    stored = [json.loads(raw) for raw in lua_redis.data["chat:r"]]
+    assert stored[0] == {"id": 3, "content": "x", "seq": 4}
+    assert seqs(stored) == [4, 3, 2]
+
+
+def test_lua_trim_archived_stops_at_unarchived(lua_redis):
+    lua_redis.data["chat:r"] = [json.dumps({"seq": s}) for s in (5, 4, 3, 2)]
+    assert lua_redis.run(TRIM_ARCHIVED_SCRIPT, ["chat:r"], [3, 3]) == 2
+    assert seqs(json.loads(m) for m in lua_redis.data["chat:r"]) == [5, 4]
+
+
+def test_lua_claim_and_release_by_token(lua_redis):
+    assert lua_redis.run(CLAIM_SCRIPT, ["owner"], ["a", 30]) == 1
+    assert lua_redis.run(CLAIM_SCRIPT, ["owner"], ["b", 30]) == 0
+    assert lua_redis.run(RELEASE_SCRIPT, ["owner"], ["b"]) == 0
+    assert lua_redis.run(RELEASE_SCRIPT, ["owner"], ["a"]) == 1
+    assert lua_redis.run(CLAIM_SCRIPT, ["owner"], ["b", 30]) == 1
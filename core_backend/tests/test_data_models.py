@@ -0,0 +1,104 @@
+from data_models import Participant, participants_list_json
+from datetime import datetime, timedelta
+import json
+import pytest
+
+
+def make_participant(**overrides):
+    fields = dict(user_id="u1", username="Alice", websocket=None, joined_at=datetime(2024, 1, 1, 12, 0))
+    fields.update(overrides)
+    return Participant(**fields)
+
+
+def old_list_entry(p):
+    # The dict add_participant used to build for each member
+    return {
+        "user_id": p.user_id,
+        "username": p.username,
+        "video_quality": p.video_quality,
+        "is_screen_sharing": p.is_screen_sharing,
+        "is_audio_muted": p.is_audio_muted,
+        "is_video_muted": p.is_video_muted
+    }
+
+
+@pytest.mark.parametrize("field, value", [
+    ("user_id", "u2"),
+    ("username", "Bob"),
+    ("joined_at", datetime(2024, 1, 1, 12, 0) + timedelta(minutes=1)),
+    ("video_quality", "high"),
+    ("role", "host"),
+    ("is_screen_sharing", True),
+    ("is_audio_muted", True),
+    ("is_video_muted", True),
+])
+def test_setter_invalidates_cached_json(field, value):
+    p = make_participant()
+    p.to_list_json()
+    setattr(p, field, value)
+    assert p._list_json is None
+    assert getattr(p, field) == value
+    assert json.loads(p.to_list_json()) == old_list_entry(p)
+
+
+@pytest.mark.parametrize("field", [
+    "user_id", "username", "joined_at", "video_quality", "role",
+    "is_screen_sharing", "is_audio_muted", "is_video_muted",
+])
+def test_setting_same_value_keeps_cache(field):
+    p = make_participant()
+    cached = p.to_list_json()
+    setattr(p, field, getattr(p, field))
+    assert p.to_list_json() is cached
+
+
+def test_flags_are_independent():
+    p = make_participant(is_audio_muted=True)
+    p.is_video_muted = True
+    p.is_audio_muted = False
+    assert (p.is_screen_sharing, p.is_audio_muted, p.is_video_muted) == (False, False, True)
+
+
+def test_participants_list_matches_json_dumps_layout():
+    participants = [
+        make_participant(),
+        make_participant(user_id="u2", username="Bób \"B\"", video_quality="low", is_video_muted=True),
+        make_participant(user_id="u3", username="Carol", is_screen_sharing=True, is_audio_muted=True),
+    ]
+    # Warm some of the caches so both cached and fresh entries are spliced
+    participants[1].to_list_json()
+
+    expected = json.dumps({
+        "type": "participants_list",
+        "participants": [old_list_entry(p) for p in participants]
+    })
+    assert participants_list_json(participants) == expected
+    assert participants_list_json([]) == json.dumps({"type": "participants_list", "participants": []})
+
+
+def test_room_view_is_built_fresh():
+    p = make_participant()
+    assert p.to_room_view() == {
+        "user_id": "u1",
+        "username": "Alice",
+        "joined_at": "2024-01-01T12:00:00",
+        "is_screen_sharing": False,
+        "video_quality": "medium"
+    }
+    assert p.to_room_view() is not p.to_room_view()
+
+
+@pytest.mark.parametrize("quality", ["ultra", "", None, 1])
+def test_invalid_video_quality_raises(quality):
+    p = make_participant()
+    with pytest.raises(ValueError):
+        p.video_quality = quality
+    assert p.video_quality == "medium"
+    with pytest.raises(ValueError):
+        make_participant(video_quality=quality)
+
+
+def test_slots_reject_unknown_attributes():
+    p = make_participant()
+    with pytest.raises(AttributeError):
+        p.unexpected = True
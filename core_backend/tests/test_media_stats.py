@@ -0,0 +1,118 @@
+from configs import Config
+from media_stats import MediaStatsTracker
+import media_stats
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_throttle(monkeypatch):
+    monkeypatch.setattr(Config, "media_recommendation_interval", 0.0)
+
+
+def report_all(tracker, users, **stats):
+    for user_id in users:
+        tracker.record("room", user_id, **stats)
+
+
+def qualities(recommendations):
+    return {user_id: r["quality"] for user_id, r in recommendations.items()}
+
+
+def test_clean_room_gets_room_cap_regardless_of_current_send_rate():
+    tracker = MediaStatsTracker()
+    users = ["a", "b", "c"]
+    # Plenty of estimated bandwidth, even though everyone currently sends "medium"
+    report_all(tracker, users, rtt_ms=50, packet_loss=0, available_in_kbps=10000, available_out_kbps=10000)
+    recommendations = tracker.recommend("room", users)
+    assert qualities(recommendations) == {"a": "high", "b": "high", "c": "high"}
+    assert all(r["limited_by"] == "room_size" for r in recommendations.values())
+
+
+def test_weakest_other_receiver_limits_sender():
+    tracker = MediaStatsTracker()
+    users = ["a", "b", "c"]
+    report_all(tracker, ["a", "b"], rtt_ms=50, packet_loss=0, available_in_kbps=10000)
+    # 1400 kbps split over two incoming streams only fits "medium"
+    tracker.record("room", "c", rtt_ms=50, packet_loss=0, available_in_kbps=1400)
+    recommendations = tracker.recommend("room", users)
+    assert recommendations["a"]["quality"] == "medium"
+    assert recommendations["a"]["limited_by"] == "receiver_bandwidth"
+    # c is not limited by its own downlink
+    assert recommendations["c"]["quality"] == "high"
+
+
+def test_room_size_caps_quality():
+    tracker = MediaStatsTracker()
+    users = [f"user-{i}" for i in range(9)]
+    report_all(tracker, users, rtt_ms=50, packet_loss=0)
+    assert set(qualities(tracker.recommend("room", users)).values()) == {"low"}
+
+
+def test_congested_room_backs_off_then_climbs_back_to_cap(monkeypatch):
+    monkeypatch.setattr(Config, "media_stats_window", 2)
+    monkeypatch.setattr(Config, "media_upgrade_stable_evaluations", 2)
+    tracker = MediaStatsTracker()
+    users = ["a", "b", "c"]
+
+    report_all(tracker, users, rtt_ms=50, packet_loss=0)
+    assert qualities(tracker.recommend("room", users)) == {"a": "high", "b": "high", "c": "high"}
+
+    # Loss on every receiver steps senders down one tier per evaluation
+    report_all(tracker, users, rtt_ms=50, packet_loss=0.3)
+    recommendations = tracker.recommend("room", users)
+    assert qualities(recommendations) == {"a": "medium", "b": "medium", "c": "medium"}
+    assert recommendations["a"]["limited_by"] == "congestion"
+    report_all(tracker, users, rtt_ms=50, packet_loss=0.3)
+    assert qualities(tracker.recommend("room", users)) == {"a": "low", "b": "low", "c": "low"}
+
+    # Healthy again: hold for the stable evaluations, then probe up a tier at a time
+    history = []
+    for _ in range(8):
+        report_all(tracker, users, rtt_ms=50, packet_loss=0)
+        history.append(qualities(tracker.recommend("room", users)).get("a"))
+    assert [q for q in history if q] == ["medium", "high"]
+    assert tracker.recommended["room"]["a"][0] == 0
+
+
+def test_drops_immediately_when_budget_falls():
+    tracker = MediaStatsTracker()
+    users = ["a", "b"]
+    report_all(tracker, users, rtt_ms=50, packet_loss=0, available_in_kbps=5000)
+    assert qualities(tracker.recommend("room", users)) == {"a": "high", "b": "high"}
+
+    for _ in range(Config.media_stats_window):
+        tracker.record("room", "b", rtt_ms=50, packet_loss=0, available_in_kbps=300)
+    assert qualities(tracker.recommend("room", users)) == {"a": "low"}
+
+
+def test_remove_drops_room_state():
+    tracker = MediaStatsTracker()
+    users = ["a", "b"]
+    report_all(tracker, users, rtt_ms=50, packet_loss=0)
+    tracker.recommend("room", users)
+    tracker.remove("room", "a")
+    tracker.remove("room", "b")
+    assert tracker.rooms == {}
+    assert tracker.recommended == {}
+    assert tracker.last_evaluated == {}
+
+
+def test_stale_receiver_stops_limiting_others(monkeypatch):
+    monkeypatch.setattr(Config, "media_upgrade_stable_evaluations", 1)
+    clock = [100.0]
+    monkeypatch.setattr(media_stats.time, "monotonic", lambda: clock[0])
+    tracker = MediaStatsTracker()
+    users = ["a", "b", "c"]
+
+    report_all(tracker, ["a", "b"], rtt_ms=50, packet_loss=0, available_in_kbps=10000)
+    tracker.record("room", "c", rtt_ms=50, packet_loss=0.3, available_in_kbps=300)
+    assert qualities(tracker.recommend("room", users))["a"] == "low"
+
+    # c goes quiet (backgrounded tab) while a and b keep reporting clean stats
+    history = []
+    for _ in range(6):
+        clock[0] += Config.media_stats_max_age / 2
+        report_all(tracker, ["a", "b"], rtt_ms=50, packet_loss=0, available_in_kbps=10000)
+        history.append(qualities(tracker.recommend("room", users)).get("a"))
+    assert "high" in history
+    assert tracker.recommended["room"]["a"][0] == 0
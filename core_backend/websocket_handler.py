@@ -1,5 +1,8 @@
 from datetime import datetime
 from connection_manager import manager
+from chat_archive import chat_archive
+from media_stats import media_stats
+from configs import Config
 import uuid
 import json
 import logging
@@ -20,6 +23,8 @@ async def handle_websocket_message(room_id: str, user_id: str, message: dict):
             await handle_file_share(room_id, user_id, message)
         elif message_type == "video_quality_change":
             await handle_video_quality_change(room_id, user_id, message)
+        elif message_type == "media_stats":
+            await handle_media_stats(room_id, user_id, message)
         elif message_type == "screen_share":
             await handle_screen_share(room_id, user_id, message)
         elif message_type == "audio_mute":
@@ -73,11 +78,8 @@ async def handle_chat_message(room_id: str, user_id: str, message: dict):
     # Store in Redis
     if manager.redis_client:
         try:
-            await manager.redis_client.lpush(
-                f"chat:{room_id}",
-                json.dumps(chat_message)
-            )
-            await manager.redis_client.ltrim(f"chat:{room_id}", 0, 99)
+            # Per-room sequence number, used as the cursor when paging history
+            chat_message["seq"] = await chat_archive.push(manager.redis_client, room_id, chat_message)
         except Exception as e:
             logger.error(f"Redis error storing chat message: {e}")
 
@@ -126,6 +128,9 @@ async def handle_file_share(room_id: str, user_id: str, message: dict):
 
 async def handle_video_quality_change(room_id: str, user_id: str, message: dict):
     quality = message.get("quality", "medium")
+    if not isinstance(quality, str) or quality not in Config.video_quality_bitrates:
+        logger.warning(f"Ignoring invalid video quality from {user_id}: {quality!r}")
+        return
     
     if room_id in manager.rooms and user_id in manager.rooms[room_id]:
         manager.rooms[room_id][user_id].video_quality = quality
@@ -139,6 +144,30 @@ async def handle_video_quality_change(room_id: str, user_id: str, message: dict)
     
     await manager.broadcast_to_room(room_id, quality_message)
 
+async def handle_media_stats(room_id: str, user_id: str, message: dict):
+    if room_id not in manager.rooms or user_id not in manager.rooms[room_id]:
+        return
+
+    stats = message.get("stats", {})
+    media_stats.record(
+        room_id,
+        user_id,
+        rtt_ms=float(stats.get("rtt_ms", 0)),
+        packet_loss=float(stats.get("packet_loss", 0)),
+        # WebRTC availableIncomingBitrate/availableOutgoingBitrate estimates
+        available_in_kbps=float(stats.get("available_incoming_kbps", 0)),
+        available_out_kbps=float(stats.get("available_outgoing_kbps", 0))
+    )
+
+    # Only senders whose recommended tier changed get a message
+    recommendations = media_stats.recommend(room_id, manager.rooms[room_id].keys())
+    for sender, recommendation in recommendations.items():
+        await manager.send_to_user(room_id, sender, {
+            "type": "video_quality_recommendation",
+            **recommendation,
+            "timestamp": datetime.now().isoformat()
+        })
+
 async def handle_screen_share(room_id: str, user_id: str, message: dict):
     is_sharing = message.get("is_sharing", False)
     